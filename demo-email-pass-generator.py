@@ -1,27 +1,61 @@
-import random
 import string
+import secrets
+
+import numpy as np
+
+ALPHABET = string.ascii_lowercase + string.digits
+EMAIL_LENGTH = 5
+PASSWORD_LENGTH = 10
+EMAIL_PREFIX = b'demo-'
+EMAIL_DOMAIN = b'@unsigned.sh'
+# Every line is demo-<5 chars>@unsigned.sh:<10 chars>\n, so the byte layout is fixed
+EMAIL_END = len(EMAIL_PREFIX) + EMAIL_LENGTH + len(EMAIL_DOMAIN)
+LINE_LENGTH = EMAIL_END + 1 + PASSWORD_LENGTH + 1
+# Map random bytes straight onto alphabet characters; bytes past the last full multiple
+# of len(ALPHABET) are dropped so every character stays equally likely
+CHARACTER_TABLE = bytes(ALPHABET.encode('ascii')[byte % len(ALPHABET)] for byte in range(256))
+REJECTED_BYTES = bytes(range(256 - 256 % len(ALPHABET), 256))
+
+def generate_random_bytes(length):
+    """Generate length random alphabet characters as ASCII bytes from the OS CSPRNG."""
+    characters = b''
+    while len(characters) < length:
+        raw = secrets.token_bytes(length - len(characters))
+        characters += raw.translate(CHARACTER_TABLE, REJECTED_BYTES)
+    return characters
 
 def generate_random_string(length):
     """Generate a random string of fixed length."""
-    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=length))
+    return generate_random_bytes(length).decode('ascii')
 
 def generate_email():
     """Generate an email with the format demo-<random 5 char string>@unsigned.sh."""
-    random_string = generate_random_string(5)
-    return f"demo-{random_string}@unsigned.sh"
+    return (EMAIL_PREFIX + generate_random_bytes(EMAIL_LENGTH) + EMAIL_DOMAIN).decode('ascii')
 
 def generate_password():
     """Generate a random 10-character password."""
-    return generate_random_string(10)
+    return generate_random_string(PASSWORD_LENGTH)
 
 def generate_email_password_pairs(num_pairs):
-    """Generate a list of email:password pairs."""
-    return [f"{generate_email()}:{generate_password()}" for _ in range(num_pairs)]
+    """Generate email:password lines as an (num_pairs, LINE_LENGTH) uint8 array of ASCII bytes."""
+    row_length = EMAIL_LENGTH + PASSWORD_LENGTH
+    chars = np.frombuffer(generate_random_bytes(num_pairs * row_length), dtype=np.uint8).reshape(num_pairs, row_length)
+
+    lines = np.empty((num_pairs, LINE_LENGTH), dtype=np.uint8)
+    domain_start = len(EMAIL_PREFIX) + EMAIL_LENGTH
+    lines[:, :len(EMAIL_PREFIX)] = np.frombuffer(EMAIL_PREFIX, dtype=np.uint8)
+    lines[:, len(EMAIL_PREFIX):domain_start] = chars[:, :EMAIL_LENGTH]
+    lines[:, domain_start:EMAIL_END] = np.frombuffer(EMAIL_DOMAIN, dtype=np.uint8)
+    lines[:, EMAIL_END] = ord(':')
+    lines[:, EMAIL_END + 1:-1] = chars[:, EMAIL_LENGTH:]
+    lines[:, -1] = ord('\n')
+    return lines
 
 def write_to_file(filename, lines):
-    """Write the generated lines to a text file."""
-    with open(filename, 'w') as file:
-        file.write('\n'.join(lines))
+    """Write the generated lines to a text file with a single write call."""
+    with open(filename, 'wb') as file:
+        # The line matrix is C-contiguous ASCII, so it is written straight from its buffer without a tobytes() copy
+        file.write(lines)
 
 def main():
     num_pairs = 100
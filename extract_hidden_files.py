@@ -1,10 +1,26 @@
 #!/usr/bin/env python3
 # extract_hidden_files.py
 
+import os
 import sys
+import mmap
+import stat
+import hashlib
 import logging
+import tempfile
+from bisect import bisect_left
 from pathlib import Path
 
+try:
+    import hyperscan
+except ImportError:  # hyperscan is optional; fall back to Aho-Corasick or bytes.find scanning
+    hyperscan = None
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional; fall back to a Numba kernel or bytes.find scanning
+    ahocorasick = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -25,22 +41,281 @@ FILE_SIGNATURES = {
     b'\xFF\xFE\x00\x00': ('txt', None),   # UTF-32 LE text file - no standard footer
 }
 
+def build_signature_database():
+    """
+    Compile FILE_SIGNATURES into a Hyperscan block-mode database.
+    Each signature is written as \\xHH escapes, since Hyperscan expressions cannot contain raw NUL bytes.
+    Returns:
+        hyperscan.Database or None: The compiled database, or None if hyperscan is not installed.
+    """
+    if hyperscan is None:
+        return None
+    database = hyperscan.Database()
+    database.compile(
+        expressions=[b''.join(b'\\x%02x' % byte for byte in signature) for signature in FILE_SIGNATURES],
+        ids=list(range(len(FILE_SIGNATURES))),
+        elements=len(FILE_SIGNATURES),
+        flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * len(FILE_SIGNATURES),
+    )
+    return database
+
+def load_signature_database(serialized: bytes):
+    """
+    Deserialize a Hyperscan database produced by hyperscan.dumpb and allocate its scratch space.
+    Parameters:
+        serialized (bytes): The serialized database.
+    Returns:
+        hyperscan.Database: The database, ready to scan.
+    """
+    database = hyperscan.loadb(serialized, hyperscan.HS_MODE_BLOCK)
+    database.scratch = hyperscan.Scratch(database)
+    return database
+
+def build_signature_automaton():
+    """
+    Build an Aho-Corasick automaton matching every entry of FILE_SIGNATURES.
+    Signatures are stored as latin-1 strings so byte offsets map one-to-one onto string indices.
+    Returns:
+        ahocorasick.Automaton or None: The automaton, or None if pyahocorasick is not installed.
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for index, (signature, (extension, footer)) in enumerate(FILE_SIGNATURES.items()):
+        automaton.add_word(signature.decode('latin-1'), (index, signature, extension, footer))
+    automaton.make_automaton()
+    return automaton
+
+def build_signature_kernel():
+    """
+    Compile a Numba kernel that scans for every entry of FILE_SIGNATURES.
+    numpy and numba are imported here rather than at module level because importing numba is slow,
+    and the kernel is only needed when neither hyperscan nor pyahocorasick is installed.
+    Returns:
+        callable or None: A function taking the binary data and returning lists of match offsets and
+                          signature indices ordered by offset then index, or None if numba is not installed.
+    """
+    try:
+        import numpy as np
+        from numba import njit
+    except ImportError:  # numba is optional; fall back to bytes.find scanning
+        return None
+
+    @njit(cache=True)
+    def scan_signatures_kernel(data, first_byte_mask, signature_table, signature_lengths):
+        offsets = []
+        indices = []
+        size = data.shape[0]
+        for offset in range(size):
+            if not first_byte_mask[data[offset]]:
+                continue
+            for index in range(signature_table.shape[0]):
+                length = signature_lengths[index]
+                if offset + length > size:
+                    continue
+                matched = True
+                for position in range(length):
+                    if data[offset + position] != signature_table[index, position]:
+                        matched = False
+                        break
+                if matched:
+                    offsets.append(offset)
+                    indices.append(index)
+        return offsets, indices
+
+    # Zero-padded signature table, with a 256-entry mask that rejects bytes no signature starts with
+    max_length = max(len(signature) for signature in FILE_SIGNATURES)
+    first_byte_mask = np.zeros(256, dtype=np.bool_)
+    signature_table = np.zeros((len(FILE_SIGNATURES), max_length), dtype=np.uint8)
+    signature_lengths = np.zeros(len(FILE_SIGNATURES), dtype=np.int64)
+    for index, signature in enumerate(FILE_SIGNATURES):
+        first_byte_mask[signature[0]] = True
+        signature_table[index, :len(signature)] = np.frombuffer(signature, dtype=np.uint8)
+        signature_lengths[index] = len(signature)
+
+    def scan(data):
+        return scan_signatures_kernel(np.frombuffer(data, dtype=np.uint8), first_byte_mask, signature_table, signature_lengths)
+    return scan
+
+def build_signature_scan_plan():
+    """
+    Group FILE_SIGNATURES by their first two bytes so signatures sharing a prefix are found with one scan.
+    For example, both GIF versions are found by scanning for GIF8 and both UTF-16/32 LE BOMs by scanning for FF FE.
+    Returns:
+        list: (needle, members) pairs, where needle is the group's common prefix and members are
+              (index, signature, extension, footer) tuples in declaration order.
+    """
+    groups = {}
+    for index, (signature, (extension, footer)) in enumerate(FILE_SIGNATURES.items()):
+        groups.setdefault(signature[:2], []).append((index, signature, extension, footer))
+    return [(os.path.commonprefix([member[1] for member in members]), members) for members in groups.values()]
+
+def get_signature_cache_directory():
+    """
+    Return a private per-user directory for the cached Hyperscan database, preferring shared memory.
+    Returns:
+        Path or None: The cache directory, or None if no safe location is available.
+    """
+    if not hasattr(os, 'getuid'):
+        return None
+    base_directory = Path('/dev/shm') if Path('/dev/shm').is_dir() else Path(tempfile.gettempdir())
+    directory = base_directory / f"extract_hidden_files-{os.getuid()}"
+    try:
+        directory.mkdir(mode=0o700, exist_ok=True)
+        directory_stat = directory.lstat()
+    except OSError:
+        return None
+    # The cached database is deserialized on load, so never trust a directory another user owns or can write to
+    if (not stat.S_ISDIR(directory_stat.st_mode) or directory_stat.st_uid != os.getuid()
+            or directory_stat.st_mode & 0o077):
+        return None
+    return directory
+
+def load_cached_signature_database():
+    """
+    Load the compiled Hyperscan database from the cache, or compile it and cache it for later runs.
+    Cache entries are keyed by this file's path and modification time, so editing FILE_SIGNATURES
+    invalidates them and separate checkouts keep separate entries.
+    Returns:
+        hyperscan.Database: The cached or freshly compiled database.
+    """
+    directory = get_signature_cache_directory()
+    if directory is None:
+        return build_signature_database()
+
+    source_path = Path(__file__).resolve()
+    source_key = hashlib.sha256(str(source_path).encode('utf-8')).hexdigest()[:16]
+    cache_path = directory / f"hyperscan-{source_key}-{source_path.stat().st_mtime_ns}.bin"
+    try:
+        return load_signature_database(cache_path.read_bytes())
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.debug(f"Ignoring unreadable signature cache '{cache_path}': {e}")
+
+    database = build_signature_database()
+    temporary_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        temporary_path.write_bytes(hyperscan.dumpb(database))
+        os.replace(temporary_path, cache_path)
+        for stale_path in directory.glob(f"hyperscan-{source_key}-*.bin"):
+            if stale_path != cache_path:
+                stale_path.unlink(missing_ok=True)
+    except OSError as e:
+        logging.debug(f"Could not write signature cache '{cache_path}': {e}")
+    return database
+
+AUTOMATON_WINDOW_SIZE = 16 << 20  # 16 MiB of data decoded per Aho-Corasick window
+HYPERSCAN_WINDOW_SIZE = 1 << 30  # Hyperscan block scans take a 32-bit length, so larger data is scanned in windows
+SIGNATURE_WINDOW_OVERLAP = max(len(signature) for signature in FILE_SIGNATURES) - 1
+SIGNATURE_ENTRIES = list(FILE_SIGNATURES.items())
+SIGNATURE_SCAN_PLAN = build_signature_scan_plan()
+# Scan backends, built on first use by load_signature_matchers
+SIGNATURE_MATCHERS_LOADED = False
+SIGNATURE_DATABASE = None
+SIGNATURE_AUTOMATON = None
+SIGNATURE_KERNEL = None
+
+def load_signature_matchers(use_cache: bool = False) -> None:
+    """
+    Build the fastest available scan backend for FILE_SIGNATURES.
+    Parameters:
+        use_cache (bool): Load the compiled Hyperscan database from the shared-memory cache, writing it on a miss.
+                          Only the command-line entry point enables this, so importing the module never touches disk.
+    Returns:
+        None
+    """
+    global SIGNATURE_MATCHERS_LOADED, SIGNATURE_DATABASE, SIGNATURE_AUTOMATON, SIGNATURE_KERNEL
+    if hyperscan is not None and use_cache:
+        SIGNATURE_DATABASE = load_cached_signature_database()
+    else:
+        SIGNATURE_DATABASE = build_signature_database()
+    SIGNATURE_AUTOMATON = build_signature_automaton() if SIGNATURE_DATABASE is None else None
+    SIGNATURE_KERNEL = build_signature_kernel() if SIGNATURE_DATABASE is None and SIGNATURE_AUTOMATON is None else None
+    SIGNATURE_MATCHERS_LOADED = True
+
 def find_file_signatures(data: bytes) -> list:
     """
     Find all file signatures in the given binary data.
+    Uses a single Hyperscan, Aho-Corasick or Numba pass when one is available, otherwise one bytes.find scan per signature prefix group.
     Parameters:
-        data (bytes): The binary data to search for file signatures.
+        data (bytes | mmap.mmap): The binary data to search for file signatures.
     Returns:
         list: A list of tuples containing the file signature, offset, file extension, and footer.
     """
-    signatures = []
-    for signature, (extension, footer) in FILE_SIGNATURES.items():
-        offset = data.find(signature)
+    if not SIGNATURE_MATCHERS_LOADED:
+        load_signature_matchers()
+
+    if SIGNATURE_DATABASE is not None:
+        # The binding silently truncates lengths of 4 GiB or more, so scan zero-copy windows of the data.
+        # Windows overlap by the longest signature minus one; a match is kept only by the window it starts in.
+        matches = []
+        with memoryview(data) as view:
+            for window_start in range(0, len(data), HYPERSCAN_WINDOW_SIZE):
+                with view[window_start:window_start + HYPERSCAN_WINDOW_SIZE + SIGNATURE_WINDOW_OVERLAP] as window:
+                    SIGNATURE_DATABASE.scan(window, match_event_handler=lambda index, start, end, flags, context: (
+                        matches.append((window_start + start, index)) if start < HYPERSCAN_WINDOW_SIZE else None
+                    ))
+        matches.sort()
+        return [
+            (signature, offset, extension, footer)
+            for offset, index in matches
+            for signature, (extension, footer) in [SIGNATURE_ENTRIES[index]]
+        ]
+
+    if SIGNATURE_AUTOMATON is not None:
+        # The automaton only accepts str, so decode the data a window at a time instead of copying it whole.
+        # Windows overlap by the longest signature minus one; a match is kept only by the window it starts in.
+        matches = []
+        for window_start in range(0, len(data), AUTOMATON_WINDOW_SIZE):
+            window = str(data[window_start:window_start + AUTOMATON_WINDOW_SIZE + SIGNATURE_WINDOW_OVERLAP], 'latin-1')
+            for end, (index, signature, extension, footer) in SIGNATURE_AUTOMATON.iter(window):
+                start = end - len(signature) + 1
+                if start < AUTOMATON_WINDOW_SIZE:
+                    matches.append((index, signature, window_start + start, extension, footer))
+        # Order by offset, then by declaration order, to match the bytes.find path
+        matches.sort(key=lambda x: (x[2], x[0]))
+        return [match[1:] for match in matches]
+
+    if SIGNATURE_KERNEL is not None:
+        offsets, indices = SIGNATURE_KERNEL(data)
+        return [
+            (signature, offset, extension, footer)
+            for offset, index in zip(offsets, indices)
+            for signature, (extension, footer) in [SIGNATURE_ENTRIES[index]]
+        ]
+
+    matches = []
+    for needle, members in SIGNATURE_SCAN_PLAN:
+        offset = data.find(needle)
         while offset != -1:
-            signatures.append((signature, offset, extension, footer))
-            offset = data.find(signature, offset + 1)
-    signatures.sort(key=lambda x: x[1])
-    return signatures
+            for index, signature, extension, footer in members:
+                if len(signature) == len(needle) or data[offset:offset + len(signature)] == signature:
+                    matches.append((offset, index, signature, extension, footer))
+            offset = data.find(needle, offset + 1)
+    matches.sort(key=lambda x: x[:2])
+    return [(signature, offset, extension, footer) for offset, _, signature, extension, footer in matches]
+
+def find_footer_positions(data: bytes, signatures: list) -> dict:
+    """
+    Find every occurrence of the footers used by the given signatures.
+    Each distinct footer is scanned once, so looking up the footer for a file is a bisect instead of a rescan.
+    Parameters:
+        data (bytes): The binary data to search for footers.
+        signatures (list): The signatures found by find_file_signatures.
+    Returns:
+        dict: A mapping of each footer to the sorted list of offsets where it occurs.
+    """
+    footer_positions = {}
+    for _, _, _, footer in signatures:
+        if footer and footer not in footer_positions:
+            positions = []
+            offset = data.find(footer)
+            while offset != -1:
+                positions.append(offset)
+                offset = data.find(footer, offset + 1)
+            footer_positions[footer] = positions
+    return footer_positions
 
 def extract_filename(data: bytes, start: int, extension: str) -> str:
     """
@@ -52,10 +327,16 @@ def extract_filename(data: bytes, start: int, extension: str) -> str:
     Returns:
         str: The extracted filename or a default name based on the extension.
     """
-    possible_filename = data[start:start+100].decode('utf-8', errors='ignore')
-    for part in possible_filename.split('\x00'):
-        if len(part) > 1 and '.' in part and part.split('.')[-1] == extension:
-            return part.strip()
+    window = data[start:start+100]
+    suffix = f'.{extension}'.encode('utf-8')
+    position = window.find(suffix)
+    while position != -1:
+        end = position + len(suffix)
+        # Only a NUL-terminated name (or one running to the window edge) ends with the extension
+        if end == len(window) or window[end] == 0:
+            name_start = window.rfind(b'\x00', 0, position) + 1
+            return window[name_start:end].decode('utf-8', errors='ignore').strip()
+        position = window.find(suffix, position + 1)
     return f'file.{extension}'
 
 def extract_files_from_image(image_path: Path, output_directory: Path) -> None:
@@ -68,29 +349,55 @@ def extract_files_from_image(image_path: Path, output_directory: Path) -> None:
         None
     """
     with open(image_path, 'rb') as img_file:
-        data = img_file.read()
+        if os.fstat(img_file.fileno()).st_size == 0:
+            logging.info("No recognizable file signatures found in the image.")
+            return
+        # Start asynchronous readahead of the whole file so cold-cache disk reads overlap with scanning
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(img_file.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        # Map the image instead of reading it so scanning and slicing work on the page cache directly
+        with mmap.mmap(img_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                data.madvise(mmap.MADV_SEQUENTIAL)
+            extract_files_from_data(data, output_directory)
 
+def extract_files_from_data(data: mmap.mmap, output_directory: Path) -> None:
+    """
+    Extract hidden files from the mapped image data.
+    Parameters:
+        data (mmap.mmap): The memory-mapped contents of the image.
+        output_directory (Path): The directory to save the extracted files.
+    Returns:
+        None
+    """
     signatures = find_file_signatures(data)
 
     if not signatures:
         logging.info("No recognizable file signatures found in the image.")
         return
 
-    for i, (signature, offset, extension, footer) in enumerate(signatures):
-        start = offset
-        if footer:
-            end = data.find(footer, start) + len(footer)
-        else:
-            end = signatures[i + 1][1] if i + 1 < len(signatures) else len(data)
+    footer_positions = find_footer_positions(data, signatures)
 
-        file_data = data[start:end]
+    # Write each file straight from the mapping; only the 100-byte filename window is copied
+    with memoryview(data) as view:
+        for i, (signature, offset, extension, footer) in enumerate(signatures):
+            start = offset
+            positions = footer_positions.get(footer, [])
+            footer_index = bisect_left(positions, start)
+            if footer_index < len(positions):
+                end = positions[footer_index] + len(footer)
+            else:
+                # No footer (or none after this signature): the file runs up to the next signature
+                end = signatures[i + 1][1] if i + 1 < len(signatures) else len(data)
 
-        filename = extract_filename(file_data, 0, extension)
-        output_file = output_directory / f"extracted_{filename}"
+            filename = extract_filename(data[start:min(end, start + 100)], 0, extension)
+            output_file = output_directory / f"extracted_{filename}"
 
-        with open(output_file, 'wb') as f:
-            f.write(file_data)
-        logging.info(f"Extracted file saved as {output_file} (size: {len(file_data)} bytes)")
+            # Release the slice even on error, otherwise closing the mapping raises BufferError over the real exception
+            with view[start:end] as file_data, open(output_file, 'wb') as f:
+                f.write(file_data)
+                file_size = len(file_data)
+            logging.info(f"Extracted file saved as {output_file} (size: {file_size} bytes)")
 
 def main() -> None:
     """
@@ -123,6 +430,7 @@ def main() -> None:
         logging.info(f"Created output directory '{output_directory}'.")
 
     try:
+        load_signature_matchers(use_cache=True)
         extract_files_from_image(image_path, output_directory)
         logging.info("File extraction completed successfully.")
     except Exception as e:
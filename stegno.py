@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 # stegno.py
 
+import os
 import sys
+import errno
+import shutil
+import stat
 import logging
-from zipfile import ZipFile
+from zipfile import ZipFile, ZipInfo
 from pathlib import Path
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,6 +18,10 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 SEPARATOR = b'\r\n\r\n'
 FILENAME_SEPARATOR = b'\0'
 LENGTH_FIELD_SIZE = 10  # 10 bytes for file length
+COPY_BUFFER_SIZE = 1 << 20  # 1 MiB chunks when streaming file contents
+# Errors meaning os.sendfile does not support this source/target pair, so a userspace copy is used instead
+SENDFILE_UNSUPPORTED_ERRNOS = {errno.EINVAL, errno.ENOTSOCK, errno.ENOSYS, errno.EOPNOTSUPP}
+DIRECTORY_SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # Directory listing is latency-bound, not CPU-bound
 
 def human_readable_size(size: int) -> str:
     """Convert a file size in bytes to a human-readable string using binary prefixes."""
@@ -23,53 +31,108 @@ def human_readable_size(size: int) -> str:
         size //= 1024
     return f"{size} EiB"
 
-def validate_inputs(image_path: Path, files_to_hide: list[Path]) -> None:
-    """Validate the input image and files to hide."""
-    if not image_path.exists() or not image_path.is_file():
-        raise FileNotFoundError(f"Image file '{image_path}' not found.")
-    for file_path in files_to_hide:
-        if not file_path.exists() or not file_path.is_file():
-            raise FileNotFoundError(f"File '{file_path}' not found.")
-
-def collect_files_from_directory(directory: Path) -> list[Path]:
-    """Collect all files from a directory."""
-    return [file for file in directory.rglob('*') if file.is_file()]
-
-def create_zip_with_files(zip_name: str, files: list[Path]) -> None:
-    """Create a ZIP archive containing the files to be hidden."""
-    with ZipFile(zip_name, 'w') as zipf:
+def get_file_size(file_path: Path, description: str = "File") -> int:
+    """Return the size of a regular file using a single stat call, raising FileNotFoundError otherwise."""
+    try:
+        file_stat = file_path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        file_stat = None
+    if file_stat is None or not stat.S_ISREG(file_stat.st_mode):
+        raise FileNotFoundError(f"{description} '{file_path}' not found.")
+    return file_stat.st_size
+
+def validate_inputs(image_path: Path, files_to_hide: list[Path]) -> tuple[int, list[tuple[Path, int]]]:
+    """Validate the input image and files to hide, returning the image size and each file with its size."""
+    image_size = get_file_size(image_path, "Image file")
+    return image_size, [(file_path, get_file_size(file_path)) for file_path in files_to_hide]
+
+def scan_directory(directory: Path) -> tuple[list[tuple[Path, int]], list[Path]]:
+    """List a single directory, returning its files with sizes and its subdirectories."""
+    files, subdirectories = [], []
+    try:
+        entries = os.scandir(directory)
+    except PermissionError:
+        return files, subdirectories  # Skip unreadable directories, as rglob does
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(Path(entry.path))
+            elif entry.is_file():
+                files.append((Path(entry.path), entry.stat().st_size))
+    return files, subdirectories
+
+def collect_files_from_directory(directory: Path) -> list[tuple[Path, int]]:
+    """Collect all files from a directory with their sizes, listing subdirectories concurrently."""
+    listings = {}
+    with ThreadPoolExecutor(max_workers=DIRECTORY_SCAN_WORKERS) as pool:
+        pending = {pool.submit(scan_directory, directory): directory}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                listing = listings[pending.pop(future)] = future.result()
+                for subdirectory in listing[1]:
+                    pending[pool.submit(scan_directory, subdirectory)] = subdirectory
+
+    # Reassemble in a stable order: a directory's own files before those of its subdirectories, as rglob does
+    files, stack = [], [directory]
+    while stack:
+        directory_files, subdirectories = listings[stack.pop()]
+        files.extend(directory_files)
+        stack.extend(reversed(subdirectories))
+    return files
+
+def create_zip_with_files(zip_file, files: list[Path]) -> None:
+    """Write a ZIP archive of the files to be hidden to a path or open file, streaming each file in chunks."""
+    with ZipFile(zip_file, 'w') as zipf:
         for file_path in files:
             arcname = file_path.relative_to(files[0].parent)  # Preserve directory structure
-            zipf.write(file_path, arcname=arcname)
-
-def concatenate_image_and_files(image_path: Path, zip_path: str, files: list[Path], output_image_path: str) -> None:
-    """Concatenate the image with the ZIP file, adding metadata for non-ZIP files."""
-    with open(image_path, 'rb') as image_file:
-        image_data = image_file.read()
-
-    with open(output_image_path, 'wb') as output_file:
-        output_file.write(image_data)
-        if zip_path:
-            with open(zip_path, 'rb') as zip_file:
-                output_file.write(zip_file.read())
-
-        for file_path in files:
-            file_size = file_path.stat().st_size
+            zinfo = ZipInfo.from_file(file_path, arcname=arcname)
+            with open(file_path, 'rb') as src, zipf.open(zinfo, 'w') as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+def copy_file_contents(file_path: Path, output_file, size: int | None = None) -> None:
+    """Stream a file into the output, copying in-kernel with os.sendfile where supported."""
+    with open(file_path, 'rb') as src:
+        if size is None:
+            size = os.fstat(src.fileno()).st_size
+        offset = 0
+        if hasattr(os, 'sendfile'):
+            output_file.flush()  # sendfile writes to the descriptor directly, behind the buffer
+            try:
+                while offset < size:
+                    sent = os.sendfile(output_file.fileno(), src.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            except OSError as e:
+                # Only absorb "sendfile can't do this" (e.g. macOS only sends to sockets); real I/O errors propagate
+                if e.errno not in SENDFILE_UNSUPPORTED_ERRNOS:
+                    raise
+        if offset < size:
+            src.seek(offset)
+            shutil.copyfileobj(src, output_file, COPY_BUFFER_SIZE)
+
+def concatenate_image_and_files(image_path: Path, zip_files: list[Path], files: list[tuple[Path, int]], output_image_path: str) -> None:
+    """Concatenate the image with a ZIP archive of zip_files, adding metadata for non-ZIP files."""
+    with open(output_image_path, 'wb', buffering=COPY_BUFFER_SIZE) as output_file:
+        copy_file_contents(image_path, output_file)
+        if zip_files:
+            # Stream the archive straight after the image; its offsets are then absolute within the output file
+            create_zip_with_files(output_file, zip_files)
+
+        for file_path, file_size in files:
             file_name = file_path.name.encode('utf-8')
             # Write metadata: file length, file name, separator
             output_file.write(f"{file_size:<{LENGTH_FIELD_SIZE}}".encode('utf-8') + file_name + FILENAME_SEPARATOR)
             # Write file content
-            with open(file_path, 'rb') as f:
-                output_file.write(f.read())
+            copy_file_contents(file_path, output_file, file_size)
             output_file.write(SEPARATOR)
 
-def log_file_sizes(image_file: Path, files_to_hide: list[Path]) -> int:
+def log_file_sizes(image_size: int, files_to_hide: list[tuple[Path, int]]) -> int:
     """Log the sizes of the image file and the files to hide."""
-    image_size = image_file.stat().st_size
     logging.info(f"Original image size: {human_readable_size(image_size)}")
     total_files_size = 0
-    for file_path in files_to_hide:
-        file_size = file_path.stat().st_size
+    for file_path, file_size in files_to_hide:
         total_files_size += file_size
         logging.info(f"File '{file_path}' size: {human_readable_size(file_size)}")
     logging.info(f"Total size of files to hide: {human_readable_size(total_files_size)}")
@@ -92,26 +155,19 @@ def main() -> None:
 
     try:
         if second_arg.is_dir():
+            image_size, _ = validate_inputs(image_file, [])
             files_to_hide = collect_files_from_directory(second_arg)
         else:
-            files_to_hide = [second_arg] + [Path(file) for file in sys.argv[3:]]
+            image_size, files_to_hide = validate_inputs(image_file, [second_arg] + [Path(file) for file in sys.argv[3:]])
 
-        validate_inputs(image_file, files_to_hide)
+        log_file_sizes(image_size, files_to_hide)
 
-        log_file_sizes(image_file, files_to_hide)
-
-        # Create a ZIP file if more than one file is being hidden
-        zip_name = None
-        if len(files_to_hide) > 1:
-            zip_name = f"hidden_files_{datetime.now().strftime('%Y%m%d%H%M%S')}.zip"
-            create_zip_with_files(zip_name, files_to_hide)
-
-        # Otherwise, use the metadata approach
+        # Hide the files in a ZIP archive if more than one file is being hidden, otherwise use the metadata approach
         output_image = image_file.stem + "_with_hidden_files" + image_file.suffix
-        concatenate_image_and_files(image_file, zip_name, files_to_hide if not zip_name else [], output_image)
-
-        if zip_name:
-            Path(zip_name).unlink()  # Clean up the temporary zip file
+        if len(files_to_hide) > 1:
+            concatenate_image_and_files(image_file, [file_path for file_path, _ in files_to_hide], [], output_image)
+        else:
+            concatenate_image_and_files(image_file, [], files_to_hide, output_image)
 
         log_final_image_size(Path(output_image))
 